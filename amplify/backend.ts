@@ -27,6 +27,18 @@ cfnBucket.notificationConfiguration = {
   },
 }
 
+// expire cached Bedrock responses written by the process-topics function
+cfnBucket.lifecycleConfiguration = {
+  rules: [
+    {
+      id: "ExpireBedrockResponseCache",
+      prefix: "cache/bedrock/",
+      status: "Enabled",
+      expirationInDays: 7,
+    },
+  ],
+}
+
 new BucketDeployment(Stack.of(s3Bucket), "UploadBackgroundImage", {
   sources: [Source.asset("./amplify/assets")],
   destinationBucket: s3Bucket,
@@ -24,6 +24,8 @@ export class CreateBackground extends Construct {
       code: Code.fromAsset('amplify/custom/lambda-functions/create-background'),
       handler: 'lambda_function.lambda_handler',
       timeout: Duration.seconds(60),
+      // resize/text rendering is CPU-bound; Lambda allocates CPU in proportion to memory
+      memorySize: 1024,
       layers: [pilLayer],
     });
 
@@ -1,4 +1,4 @@
-import { Code, Function, Runtime } from "aws-cdk-lib/aws-lambda";
+import { Code, Function, Runtime, LayerVersion } from "aws-cdk-lib/aws-lambda";
 import { Construct } from "constructs";
 import { IBucket } from "aws-cdk-lib/aws-s3";
 import { ITable } from "aws-cdk-lib/aws-dynamodb";
@@ -15,6 +15,12 @@ export class ExtractTimeframe extends Construct {
   constructor(scope: Construct, id: string, props: ExtractTimeframeProps) {
     super(scope, id);
 
+    const orjsonLayer = new LayerVersion(this, "OrjsonLayer", {
+      code: Code.fromAsset("amplify/custom/lambda-layers/orjson"),
+      compatibleRuntimes: [Runtime.PYTHON_3_12],
+      description: "A layer to access the orjson library",
+    });
+
     // cdk consturct to create lambda function
     this.handler = new Function(this, "ExtractTimeframe", {
       runtime: Runtime.PYTHON_3_12,
@@ -26,6 +32,7 @@ export class ExtractTimeframe extends Construct {
       },
       timeout: Duration.seconds(600),
       memorySize: 1024,
+      layers: [orjsonLayer],
     });
 
     props.bucket.grantReadWrite(this.handler);
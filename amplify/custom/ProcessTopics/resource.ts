@@ -1,4 +1,4 @@
-import { Code, Function, Runtime } from 'aws-cdk-lib/aws-lambda';
+import { Code, Function, Runtime, LayerVersion } from 'aws-cdk-lib/aws-lambda';
 import { Construct } from 'constructs';
 import { IBucket } from 'aws-cdk-lib/aws-s3';
 import { ITable } from 'aws-cdk-lib/aws-dynamodb';
@@ -16,6 +16,12 @@ export class ProcessTopics extends Construct {
   constructor(scope: Construct, id: string, props: ProcessTopicsProps) {
     super(scope, id);
 
+    const orjsonLayer = new LayerVersion(this, 'OrjsonLayer', {
+      code: Code.fromAsset('amplify/custom/lambda-layers/orjson'),
+      compatibleRuntimes: [Runtime.PYTHON_3_12],
+      description: 'A layer to access the orjson library',
+    });
+
     // cdk consturct to create lambda function
     this.handler = new Function(this, 'ProcessTopicsBedrock', {
       runtime: Runtime.PYTHON_3_12,
@@ -28,7 +34,8 @@ export class ProcessTopics extends Construct {
 
       },
       timeout: Duration.seconds(600),
-      memorySize: 512
+      memorySize: 512,
+      layers: [orjsonLayer],
     });
 
     props.bucket.grantReadWrite(this.handler);
@@ -40,6 +47,7 @@ export class ProcessTopics extends Construct {
         resources: ["*"],
         actions: [
           "bedrock:InvokeModel",
+          "bedrock:InvokeModelWithResponseStream",
         ],
       })
     )
@@ -1,49 +1,120 @@
+import functools
 import json
+import os
 import boto3
+import botocore
 from PIL import Image, ImageFont, ImageDraw
 from io import BytesIO
 
-s3 = boto3.client('s3')
+# Step Functions 병렬 실행 시 동일 에셋 GET이 몰리므로 adaptive 재시도와 큰 커넥션 풀 사용
+s3 = boto3.client(
+    's3',
+    config=botocore.config.Config(
+        retries={'mode': 'adaptive', 'max_attempts': 10},
+        max_pool_connections=50,
+        tcp_keepalive=True
+    )
+)
+
+# vertical 여부별로 리사이즈된 배경 이미지를 컨테이너 수명 동안 재사용
+_BG_CACHE = {}
 
 def wrap_text(text, width, font):
     """Wrap text naturally without stretching"""
     lines = []
-    words = text.split()
     current_line = []
+    line_width = 0
+    
+    # 단어별 advance 폭을 한 번씩만 측정하고 줄 폭은 누적합으로 계산
+    space_width = _text_length(font, ' ')
     
-    for word in words:
-        current_line.append(word)
-        test_line = ' '.join(current_line)
-        bbox = font.getbbox(test_line)
-        line_width = bbox[2] - bbox[0]
+    for word in text.split():
+        word_width = _text_length(font, word)
+        test_width = line_width + space_width + word_width if current_line else word_width
         
-        if line_width > width:
-            if len(current_line) > 1:
-                current_line.pop()
+        if test_width > width:
+            if current_line:
                 lines.append(' '.join(current_line))
                 current_line = [word]
+                line_width = word_width
             else:
                 lines.append(word)
-                current_line = []
+        else:
+            current_line.append(word)
+            line_width = test_width
     
     if current_line:
         lines.append(' '.join(current_line))
     
     return lines
 
-def load_font(font_path, size):
+@functools.lru_cache(maxsize=64)
+def load_font(font_path, size, layout_engine=None):
     try:
-        font = ImageFont.truetype(font_path, size)
+        font = ImageFont.truetype(font_path, size, layout_engine=layout_engine)
         return font
     except IOError:
         print("Failed to load the primary font. Falling back to secondary font.")
         return None
 
+# 폰트는 load_font에서 캐싱되므로 (font, text) 조합의 측정 결과도 재사용 가능
+@functools.lru_cache(maxsize=4096)
+def _text_length(font, text):
+    return font.getlength(text)
+
+@functools.lru_cache(maxsize=4096)
+def _text_bbox(font, text):
+    return font.getbbox(text)
+
 def get_text_dimensions(text, font):
     """Get the actual dimensions of the text without stretching"""
-    bbox = font.getbbox(text)
+    bbox = _text_bbox(font, text)
     return bbox[2] - bbox[0], bbox[3] - bbox[1]  # width, height
 
+def load_background(bucket_name, source_key, vertical, size):
+    """Load the background once per container, resized to the target size"""
+    if vertical in _BG_CACHE:
+        return _BG_CACHE[vertical]
+
+    cache_path = '/tmp/bg_v.png' if vertical else '/tmp/bg_h.png'
+    base_image = None
+    if os.path.exists(cache_path):
+        try:
+            base_image = Image.open(cache_path)
+            base_image.load()
+        except (OSError, ValueError):
+            # 손상된 캐시 파일은 지우고 S3에서 다시 받음
+            print(f"Invalid cached background {cache_path}. Re-downloading from S3.")
+            base_image = None
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+
+    if base_image is None:
+        response_image = s3.get_object(Bucket=bucket_name, Key=source_key)['Body'].read()
+        base_image = Image.open(BytesIO(response_image))
+        base_image.load()
+
+        # 중간에 중단되어도 잘린 파일이 남지 않도록 임시 파일에 쓴 뒤 교체
+        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(response_image)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Failed to cache background to {cache_path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    if base_image.size != size:
+        base_image = base_image.resize(size, Image.LANCZOS)
+
+    _BG_CACHE[vertical] = base_image
+    return base_image
+
 def lambda_handler(event, context):
     bucket_name = event["bucket_name"]   
     uuid = event['videoId']
@@ -75,12 +146,8 @@ def lambda_handler(event, context):
     
     destination_dir = f'videos/{uuid}/background'
     
-    # 기존 코드와 동일: 이미지 로드 및 준비
-    response_image = s3.get_object(Bucket=bucket_name, Key=source_key)['Body'].read()
-    base_image = Image.open(BytesIO(response_image))
-    
-    if base_image.size != (image_width, image_height):
-        base_image = base_image.resize((image_width, image_height), Image.LANCZOS)
+    # 캐시된 배경을 복사해서 사용 (캐시 원본은 수정하지 않음)
+    base_image = load_background(bucket_name, source_key, vertical, (image_width, image_height)).copy()
     
     draw = ImageDraw.Draw(base_image)
     
@@ -93,20 +160,22 @@ def lambda_handler(event, context):
     available_height = title_height - (2 * padding_y)  # 이제 이 높이는 90px (340-250-2*10)
     line_spacing = 8
     
-    # 폰트 크기 찾기 로직은 동일하게 유지
-    text_size = initial_text_size
+    # ASCII 제목은 복잡한 셰이핑이 필요 없으므로 BASIC 레이아웃 고정
+    # 현재 Pillow 레이어는 Raqm 없이 빌드되어 모든 제목이 이미 BASIC으로 처리됨
+    # (Raqm이 포함된 레이어로 교체하기 전까지는 효과 없음)
+    layout_engine = ImageFont.Layout.BASIC if question.isascii() else None
+    
     min_text_size = 40
     
-    while text_size >= min_text_size:
-        font = load_font(font_path, text_size)
+    def fits(size):
+        font = load_font(font_path, size, layout_engine)
         if not font:
-            break
+            return False
             
         lines = wrap_text(question, available_width, font)
         
         if len(lines) > 2:  # 최대 2줄로 제한
-            text_size -= 2
-            continue
+            return False
             
         # 총 높이 계산
         total_height = 0
@@ -118,10 +187,22 @@ def lambda_handler(event, context):
             total_height += line_spacing * (len(lines) - 1)
             
         # 제한된 높이에 맞는지 확인
-        if total_height <= available_height:
-            break
-            
-        text_size -= 2
+        return total_height <= available_height
+    
+    # 폰트 크기가 작을수록 항상 들어맞으므로 2px 단위 후보를 이진 탐색
+    # 들어맞는 크기가 없으면 최소 크기를 사용
+    candidate_sizes = list(range(min_text_size, initial_text_size + 1, 2))
+    lo, hi = 0, len(candidate_sizes) - 1
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if fits(candidate_sizes[mid]):
+            lo = mid
+        else:
+            hi = mid - 1
+    
+    text_size = candidate_sizes[lo]
+    font = load_font(font_path, text_size, layout_engine)
+    lines = wrap_text(question, available_width, font)
     
     # 제한된 영역 내에서 세로 중앙 정렬 계산
     total_height = 0
@@ -148,11 +229,11 @@ def lambda_handler(event, context):
         current_y += line_heights[i] + line_spacing
     
     # 저장 및 업로드 코드는 동일하게 유지
+    # 압축률보다 인코딩 속도가 중요하므로 zlib 레벨 1로 저장
     buffer = BytesIO()
-    base_image.save(buffer, format='png')
-    buffer.seek(0)
+    base_image.save(buffer, format='png', compress_level=1, optimize=False)
     destination_key = f'{destination_dir}/{index}.png'
-    s3.put_object(Bucket=bucket_name, Key=destination_key, Body=buffer, ContentType='image/png')
+    s3.put_object(Bucket=bucket_name, Key=destination_key, Body=buffer.getvalue(), ContentType='image/png')
     
     return {
         'statusCode': 200,
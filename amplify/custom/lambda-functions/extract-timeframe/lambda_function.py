@@ -1,28 +1,35 @@
 import boto3
+import botocore
 import json
 import os
 import logging
+import orjson
 from datetime import datetime
 
 # Set up logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-s3 = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
+# Initialize AWS clients (keep-alive to reuse connections across warm invocations)
+keepalive_config = botocore.config.Config(tcp_keepalive=True)
+s3 = boto3.client('s3', config=keepalive_config)
+dynamodb = boto3.resource('dynamodb', config=keepalive_config)
 
 # Get environment variables
 BUCKET_NAME = os.environ["BUCKET_NAME"]
 HIGHLIGHT_TABLE_NAME = os.environ["HIGHLIGHT_TABLE_NAME"]
 
+shorts_table = dynamodb.Table(HIGHLIGHT_TABLE_NAME)
+
 def convert_seconds_to_timecode(seconds):
     """초를 타임코드 형식(HH:MM:SS:FF)으로 변환"""
     seconds = float(seconds)
-    hours, seconds = divmod(seconds, 3600)
-    minutes, seconds = divmod(seconds, 60)
-    frames = int((seconds - int(seconds)) * 30)  # 30 fps 가정
-    return "{:02d}:{:02d}:{:02d}:{:02d}".format(int(hours), int(minutes), int(seconds), frames)
+    whole_seconds = int(seconds)
+    frames = int((seconds - whole_seconds) * 30)  # 30 fps 가정
+    # 정수 초 단위로 시/분/초 계산 (float divmod 생략)
+    minutes, secs = divmod(whole_seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}:{frames:02d}"
 
 def lambda_handler(event, context):
     try:
@@ -31,8 +38,6 @@ def lambda_handler(event, context):
         
         logger.info(f"Processing request for UUID: {uuid}, Index: {index}")
 
-        shorts_table = dynamodb.Table(HIGHLIGHT_TABLE_NAME)
-
         raw_file_path = f's3://{BUCKET_NAME}/videos/{uuid}/RAW.mp4'
         output_destination = f's3://{BUCKET_NAME}/videos/{uuid}/FHD/{index}-FHD'
 
@@ -45,7 +50,7 @@ def lambda_handler(event, context):
 
         # 이전 Lambda에서 전달된 timeframes 정보 파싱
         try:
-            timeframes_data = json.loads(item.get("timeframes", "[]"))
+            timeframes_data = orjson.loads(item.get("timeframes", "[]"))
             
             # timeframes 데이터 형식 확인 및 처리
             timeframes = []
@@ -99,7 +104,7 @@ def lambda_handler(event, context):
             Key={'VideoName': uuid, 'Index': index},
             UpdateExpression='SET #dur = :durVal, #tf = :tfVal',
             ExpressionAttributeNames={'#dur': 'duration', '#tf': 'timeframes'},
-            ExpressionAttributeValues={':durVal': total_duration, ':tfVal': json.dumps(formatted_timeframes)}
+            ExpressionAttributeValues={':durVal': total_duration, ':tfVal': orjson.dumps(formatted_timeframes).decode()}
         )
 
         logger.info(f"Successfully processed request for UUID: {uuid}, Index: {index}")
@@ -1,30 +1,47 @@
 import json
 import boto3
 import botocore
+import orjson
 import os
+import re
 import time
 
-s3 = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
+# <thought> 블록에 '{'가 있어도 JSON 블록만 잘라내도록 태그 기준으로 추출
+_JSON_RE = re.compile(r'<JSON>\s*(\{.*?\})\s*</JSON>', re.DOTALL)
+
+# 웜 호출 간 TCP 연결 재사용
+keepalive_config = botocore.config.Config(tcp_keepalive=True)
+
+s3 = boto3.client('s3', config=keepalive_config)
+dynamodb = boto3.resource('dynamodb', config=keepalive_config)
 bedrock = boto3.client(
     service_name='bedrock-runtime',
     region_name='us-west-2',
-    config=botocore.config.Config(connect_timeout=1000, read_timeout=1000)
+    config=botocore.config.Config(connect_timeout=1000, read_timeout=1000, tcp_keepalive=True)
 )
 
-def lambda_handler(event, context):
-    bucket_name = os.environ["BUCKET_NAME"]
-    table_name = os.environ["HISTORY_TABLE_NAME"]
+# Bedrock 요청 본문은 프롬프트만 바뀌므로 나머지 JSON은 미리 직렬화해 두고 프롬프트만 이스케이프
+_BODY_PREFIX, _BODY_SUFFIX = json.dumps({
+    "anthropic_version": "bedrock-2023-05-31",
+    "max_tokens": 4096,
+    "messages": [{"role": "user", "content": [{"type": "text", "text": "__PROMPT__"}]}],
+    "temperature": 0.5,
+    "top_p": 0.9
+}).split('"__PROMPT__"')
+
+# 환경 변수 및 테이블 리소스는 콜드 스타트 시 한 번만 초기화
+BUCKET_NAME = os.environ["BUCKET_NAME"]
+history_table = dynamodb.Table(os.environ["HISTORY_TABLE_NAME"])
 
+def lambda_handler(event, context):
     uuid = event['uuid']
     source_file_key = f"videos/{uuid}/Transcript.json"
 
-    history = dynamodb.Table(table_name)
-    video_history = history.get_item(Key={'id': uuid})
+    video_history = history_table.get_item(Key={'id': uuid})
     modelID = video_history['Item']['modelID']
     
-    response = s3.get_object(Bucket=bucket_name, Key=source_file_key)
-    transcript_json = json.load(response['Body'])
+    response = s3.get_object(Bucket=BUCKET_NAME, Key=source_file_key)
+    transcript_json = orjson.loads(response['Body'].read())
     script = transcript_json['results']['transcripts'][0]['transcript']
 
     topics = get_topics_from_transcript(script, modelID)
@@ -38,6 +55,16 @@ def lambda_handler(event, context):
         'script': script
     }
 
+def extract_json(response_text):
+    """응답의 <JSON> 태그 안에서 JSON 추출 (태그가 없으면 첫 '{'부터 마지막 '}'까지 사용)"""
+    match = _JSON_RE.search(response_text)
+    if match:
+        return orjson.loads(match.group(1))
+    
+    firstIndex = response_text.find('{')
+    endIndex = response_text.rfind('}')
+    return orjson.loads(response_text[firstIndex:endIndex+1])
+
 def get_topics_from_transcript(script, modelID):
     prompt = f"""
     Human:
@@ -75,13 +102,7 @@ def get_topics_from_transcript(script, modelID):
     \n\nAssistant: <JSON>
     """
 
-    body = json.dumps({
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 4096,
-        "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}],
-        "temperature": 0.5,
-        "top_p": 0.9
-    })
+    body = _BODY_PREFIX + json.dumps(prompt, ensure_ascii=False) + _BODY_SUFFIX
 
     #for test, to delete later
     # modelID = "anthropic.claude-3-5-sonnet-20240620-v1:0"
@@ -91,8 +112,5 @@ def get_topics_from_transcript(script, modelID):
     response_body = json.loads(response['body'].read())
     rawTopics = response_body['content'][0]['text']
 
-    firstIndex = rawTopics.find('{')
-    endIndex = rawTopics.rfind('}')
-    
-    topics = json.loads(rawTopics[firstIndex:endIndex+1])
+    topics = extract_json(rawTopics)
     return topics["Topics"]
\ No newline at end of file
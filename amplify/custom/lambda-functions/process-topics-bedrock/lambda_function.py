@@ -1,18 +1,39 @@
 import datetime
+import hashlib
 import json
 import boto3
 import botocore
+import itertools
+import orjson
 import os
+import random
+import re
 import time
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 
-dynamodb = boto3.resource('dynamodb')
+# <thought> 블록에 '{'가 있어도 JSON 블록만 잘라내도록 태그 기준으로 추출
+_JSON_RE = re.compile(r'<JSON>\s*(\{.*?\})\s*</JSON>', re.DOTALL)
+
+# 동일한 (모델, 프롬프트) 요청의 Bedrock 응답을 저장하는 S3 경로
+BEDROCK_CACHE_PREFIX = 'cache/bedrock'
+
+# createdAt/updatedAt에 사용하는 UTC 타임스탬프 형식
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+# 웜 호출 간 TCP 연결 재사용
+keepalive_config = botocore.config.Config(tcp_keepalive=True)
+
+dynamodb = boto3.resource('dynamodb', config=keepalive_config)
 bedrock = boto3.client(
     service_name='bedrock-runtime',
     region_name='us-west-2',
-    config=botocore.config.Config(connect_timeout=1000, read_timeout=1000)
+    config=botocore.config.Config(connect_timeout=1000, read_timeout=1000, tcp_keepalive=True)
 )
-s3 = boto3.client('s3')
+s3 = boto3.client('s3', config=keepalive_config)
+
+# 환경 변수 및 테이블 리소스는 콜드 스타트 시 한 번만 초기화
+BUCKET_NAME = os.environ["BUCKET_NAME"]
+shorts_table = dynamodb.Table(os.environ["HIGHLIGHT_TABLE_NAME"])
 
 def lambda_handler(event, context):
     topic = event['topic']
@@ -24,8 +45,7 @@ def lambda_handler(event, context):
     script = event['script']  # 첫 번째 Lambda에서 전달된 스크립트
 
     # S3에서 타임스탬프가 포함된 트랜스크립트 가져오기
-    bucket_name = os.environ.get("BUCKET_NAME")
-    transcript_json = get_transcript_from_s3(bucket_name, uuid)
+    transcript_json = get_transcript_from_s3(BUCKET_NAME, uuid)
     
     # 타임스탬프가 포함된 스크립트 생성
     timestamped_script = create_timestamped_script(transcript_json)
@@ -42,7 +62,7 @@ def get_transcript_from_s3(bucket_name, uuid):
     """S3에서 트랜스크립트 JSON 가져오기"""
     try:
         json_object = s3.get_object(Bucket=bucket_name, Key=f'videos/{uuid}/Transcript.json')
-        json_content = json.load(json_object['Body'])
+        json_content = orjson.loads(json_object['Body'].read())
         return json_content
     except Exception as e:
         print(f"S3에서 트랜스크립트를 가져오는 중 오류 발생: {str(e)}")
@@ -53,58 +73,53 @@ def create_timestamped_script(transcript_json):
     items = transcript_json['results']['items']
     
     timestamped_script = []
+    append_sentence = timestamped_script.append
     
     current_sentence = []
     sentence_start_time = None
     last_end_time = None
     
     for item in items:
-        if item['type'] == 'pronunciation':
-            word = item['alternatives'][0]['content']
-            start_time = float(item['start_time'])
-            end_time = float(item['end_time'])
-            
+        item_type = item['type']
+        content = item['alternatives'][0]['content']
+        
+        if item_type == 'pronunciation':
             if sentence_start_time is None:
-                sentence_start_time = start_time
+                sentence_start_time = float(item['start_time'])
             
-            current_sentence.append(word)
-            last_end_time = end_time
+            current_sentence.append(content)
+            last_end_time = item['end_time']
             
         # 구두점 처리
-        elif item['type'] == 'punctuation':
-            punctuation = item['alternatives'][0]['content']
+        elif item_type == 'punctuation':
             if current_sentence:
-                current_sentence[-1] += punctuation
+                current_sentence[-1] += content
             
             # 문장 종결 구두점인 경우 문장 완성
-            if punctuation in ['.', '?', '!']:
-                sentence_text = ' '.join(current_sentence)
-                timestamped_script.append({
-                    'text': sentence_text,
+            if content in ('.', '?', '!'):
+                append_sentence({
+                    'text': ' '.join(current_sentence),
                     'start_time': sentence_start_time,
-                    'end_time': last_end_time
+                    'end_time': float(last_end_time) if last_end_time is not None else None
                 })
                 current_sentence = []
                 sentence_start_time = None
     
     # 남은 문장 처리
     if current_sentence and sentence_start_time is not None:
-        sentence_text = ' '.join(current_sentence)
-        timestamped_script.append({
-            'text': sentence_text,
+        append_sentence({
+            'text': ' '.join(current_sentence),
             'start_time': sentence_start_time,
-            'end_time': last_end_time
+            'end_time': float(last_end_time)
         })
     
     return timestamped_script
     
 def process_topic(topic, topics, timestamped_script, uuid, modelID, owner, index):
-    shorts = dynamodb.Table(os.environ["HIGHLIGHT_TABLE_NAME"])
-    
     # 타임스탬프가 포함된 스크립트로 섹션 추출 및 처리
     section_data = extract_and_process_section(topic, topics, timestamped_script, modelID)
     
-    timestamp = datetime.datetime.now(datetime.UTC).isoformat()[:-6]+"Z"
+    timestamp = datetime.datetime.now(datetime.UTC).strftime(TIMESTAMP_FORMAT)
     
     highlight = {
         "Text": section_data['text'],
@@ -117,10 +132,61 @@ def process_topic(topic, topics, timestamped_script, uuid, modelID, owner, index
         "timeframes": json.dumps(section_data['timeframes'])  # 타임스탬프 정보 저장
     }
     
-    shorts.put_item(Item=highlight)
+    shorts_table.put_item(Item=highlight)
     
     return section_data
 
+def extract_json(response_text):
+    """응답의 <JSON> 태그 안에서 JSON 추출 (태그가 없으면 첫 '{'부터 마지막 '}'까지 사용)"""
+    match = _JSON_RE.search(response_text)
+    if match:
+        return orjson.loads(match.group(1))
+    
+    firstIndex = response_text.find('{')
+    endIndex = response_text.rfind('}')
+    return orjson.loads(response_text[firstIndex:endIndex+1])
+
+def get_cache_key(modelID, inference_config, prompt):
+    """모델, 추론 설정, 프롬프트로 Bedrock 응답 캐시 키 생성"""
+    cache_source = "\n".join([modelID, json.dumps(inference_config, sort_keys=True), prompt])
+    digest = hashlib.blake2b(cache_source.encode('utf-8'), digest_size=16).hexdigest()
+    return f"{BEDROCK_CACHE_PREFIX}/{digest}.txt"
+
+def get_cached_response(cache_key):
+    """S3에 캐싱된 Bedrock 응답 조회 (없거나 조회 실패 시 None)"""
+    try:
+        cached = s3.get_object(Bucket=BUCKET_NAME, Key=cache_key)
+        return cached['Body'].read().decode('utf-8')
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'NoSuchKey':
+            print(f"캐시 조회 중 오류 발생: {str(e)}")
+        return None
+    except (BotoCoreError, UnicodeDecodeError) as e:
+        # 네트워크 오류나 손상된 캐시는 캐시 미스로 처리
+        print(f"캐시 조회 중 오류 발생: {str(e)}")
+        return None
+
+def put_cached_response(cache_key, response_text):
+    """검증이 끝난 Bedrock 응답을 S3에 캐싱 (실패해도 처리는 계속)"""
+    try:
+        s3.put_object(Bucket=BUCKET_NAME, Key=cache_key, Body=response_text.encode('utf-8'), ContentType='text/plain; charset=utf-8')
+    except (ClientError, BotoCoreError) as e:
+        print(f"캐시 저장 중 오류 발생: {str(e)}")
+
+def read_stream_text(stream):
+    """converse_stream 응답의 텍스트를 누적 (JSON 블록이 닫히면 나머지 스트림은 읽지 않음)"""
+    response_text = ''
+    for event in stream:
+        if 'contentBlockDelta' not in event:
+            continue
+        delta = event['contentBlockDelta']['delta'].get('text', '')
+        response_text += delta
+        # 태그가 청크 경계에 걸칠 수 있으므로 새 청크 주변만 확인
+        if '</JSON>' in response_text[-(len(delta) + len('</JSON>')):]:
+            stream.close()
+            break
+    return response_text
+
 def extract_and_process_section(topic, topics, timestamped_script, modelID):
     # 번호가 매겨진 목록으로 스크립트 전달
     script_numbered = "\n".join([f"{i+1}. \"{item['text']}\"" for i, item in enumerate(timestamped_script)])
@@ -163,14 +229,12 @@ Brief explanation of why these specific sentences best represent the topic
 </JSON>
 """
 
+    messages = [{"role": "user", "content": [{"text": prompt}]}]
+    inference_config = {"maxTokens": 4096, "temperature": 0, "topP": 0}
 
-    body = json.dumps({
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 4096,
-        "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}],
-        "temperature": 0,
-        "top_p": 0
-    })
+    # temperature 0이므로 동일 요청의 응답은 같음 - 재처리/재시도 시 캐시된 응답 사용
+    cache_key = get_cache_key(modelID, inference_config, prompt)
+    cached_text = get_cached_response(cache_key)
 
     # 지수 백오프 재시도 로직
     max_retries = 30
@@ -179,16 +243,16 @@ Brief explanation of why these specific sentences best represent the topic
 
     while True:
         try:
-            response = bedrock.invoke_model(body=body, accept='*/*', contentType='application/json', modelId=modelID)
-            response_body = json.loads(response['body'].read())
-            response_text = response_body['content'][0]['text']
+            if cached_text is not None:
+                print("캐시된 Bedrock 응답 사용:", cache_key)
+                response_text = cached_text
+            else:
+                response = bedrock.converse_stream(modelId=modelID, messages=messages, inferenceConfig=inference_config)
+                response_text = read_stream_text(response['stream'])
             
             print("Bedrock Response:", response_text)
             
-            firstIndex = int(response_text.find('{'))
-            endIndex = int(response_text.rfind('}'))
-            
-            chunk = json.loads(response_text[firstIndex:endIndex+1])
+            chunk = extract_json(response_text)
             
             # 안전성 검사: selected_numbers 존재 여부 확인
             if 'selected_numbers' not in chunk:
@@ -226,43 +290,19 @@ Brief explanation of why these specific sentences best represent the topic
             print(f"유효한 문장 번호: {valid_numbers}")
             
             # 선택된 문장들을 결합하여 최종 텍스트 생성
+            # 연속된 번호 구간에서는 (번호 - 위치) 값이 같으므로 이를 기준으로 구간을 나눔
             text_segments = []
             timeframes = []
-            current_segment = []
-            current_start = None
-            current_end = None
             
-            for i, num in enumerate(valid_numbers):
-                idx = num - 1  # 0-based index로 변환
-                sentence = timestamped_script[idx]
-                
-                # 연속된 문장 확인
-                if i > 0 and num != valid_numbers[i-1] + 1:
-                    # 비연속 구간 발견 - 현재까지의 세그먼트 저장
-                    if current_segment:
-                        text_segments.append(" ".join(current_segment))
-                        timeframes.append({
-                            "text": " ".join(current_segment),
-                            "start_time": current_start,
-                            "end_time": current_end
-                        })
-                        current_segment = []
-                        current_start = None
-                        current_end = None
+            for _, group in itertools.groupby(enumerate(valid_numbers), key=lambda pair: pair[1] - pair[0]):
+                sentences = [timestamped_script[num - 1] for _, num in group]  # 0-based index로 변환
+                segment_text = " ".join(sentence['text'] for sentence in sentences)
                 
-                current_segment.append(sentence['text'])
-                if current_start is None or sentence['start_time'] < current_start:
-                    current_start = sentence['start_time']
-                if current_end is None or sentence['end_time'] > current_end:
-                    current_end = sentence['end_time']
-            
-            # 마지막 세그먼트 처리
-            if current_segment:
-                text_segments.append(" ".join(current_segment))
+                text_segments.append(segment_text)
                 timeframes.append({
-                    "text": " ".join(current_segment),
-                    "start_time": current_start,
-                    "end_time": current_end
+                    "text": segment_text,
+                    "start_time": min(sentence['start_time'] for sentence in sentences),
+                    "end_time": max(sentence['end_time'] for sentence in sentences)
                 })
             
             # 최종 텍스트 생성 ([...] 구분자 사용)
@@ -277,14 +317,19 @@ Brief explanation of why these specific sentences best represent the topic
             print("\nFINAL RESULT WITH TIMEFRAMES:")
             print(json.dumps(result, indent=2, ensure_ascii=False))
             
+            if cached_text is None:
+                put_cached_response(cache_key, response_text)
+            
             return result
 
         except ClientError as e:
-            if e.response['Error']['Code'] == 'ThrottlingException' and retry_count < max_retries:
+            # 스트림 도중 발생한 오류는 코드가 소문자로 시작 (throttlingException)
+            if e.response['Error']['Code'] in ('ThrottlingException', 'throttlingException') and retry_count < max_retries:
                 retry_count += 1
                 backoff_time = min(2 ** (retry_count - 1), max_backoff)
-                sleep_time = backoff_time                
-                print(f"ThrottlingException 발생. {sleep_time}초 후 재시도 ({retry_count}/{max_retries})...")
+                # full jitter: 동시에 스로틀링된 호출들이 같은 시점에 재시도하지 않도록 분산
+                sleep_time = random.uniform(0, backoff_time)
+                print(f"ThrottlingException 발생. {sleep_time:.2f}초 후 재시도 ({retry_count}/{max_retries})...")
                 time.sleep(sleep_time)
             else:
                 print(f"오류 발생: {str(e)}")